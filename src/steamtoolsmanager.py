@@ -1,16 +1,27 @@
+import argparse
 import base64
+import hashlib
 import io
+import itertools
 import math
 import re
 import shutil
+import sqlite3
+import tempfile
+import time
 import zipfile
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from collections import defaultdict
+from contextlib import contextmanager
 from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from typing import Iterable, Optional
+from urllib.parse import urlsplit
 import json
 import os
 import queue
+import random
 import subprocess
 import sys
 import threading
@@ -38,6 +49,16 @@ try:
 except ImportError:  # pragma: no cover - 非 Windows 系统
     winreg = None
 
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+try:
+    import msvcrt  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - 非 Windows 系统
+    msvcrt = None
+
 
 ALLOWED_SUFFIXES: Iterable[str] = (".lua", ".manifest", ".json", ".vdf")
 NODE_TIMEOUT = 1
@@ -52,27 +73,1254 @@ BACKGROUND_IMAGE_PATH = Path("./background.png")
 BACKGROUND_BLUR_RADIUS = 12
 BACKGROUND_OPACITY = 0.35
 BACKGROUND_BASE_COLOR = "#f0f0f0"
+OVERSEAS_API_BASE = "https://api-psi-eight-12.vercel.app"
+OVERSEAS_NODE_COUNT = 6
+BASE32_ALPHABET = "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"
+APPID_CACHE_SIZE = 8192
+
+
+def _base32_encode_legacy(input_str: str) -> str:
+    # 原始实现：逐字符拼接二进制串，码点超过 255 时位宽不固定。
+    bits = "".join(bin(ord(c))[2:].zfill(8) for c in input_str)
+    result = []
+    for i in range(0, len(bits), 5):
+        chunk = bits[i : i + 5].ljust(5, "0")
+        result.append(BASE32_ALPHABET[int(chunk, 2)])
+    return "".join(result)
+
+
+@lru_cache(maxsize=APPID_CACHE_SIZE)
+def base32_encode(input_str: str) -> str:
+    """Encode like the legacy bit-string encoder, via the C base32 codec when possible."""
+    try:
+        raw = input_str.encode("latin-1")
+    except UnicodeEncodeError:
+        return _base32_encode_legacy(input_str)
+    return base64.b32encode(raw).decode("ascii").rstrip("=")
+
+
+@lru_cache(maxsize=APPID_CACHE_SIZE * OVERSEAS_NODE_COUNT)
+def overseas_download_url(appid: str, node: int) -> str:
+    return f"{OVERSEAS_API_BASE}/download?id={base32_encode(appid)}&src={node}"
+
+
+TEMP_PREFIX = ".tmp-"
+LOCK_DIR_NAME = ".locks"
+LEGACY_ARTIFACT_PATTERN = re.compile(r"^(?P<tag>\d+)(?:_src\d+)?\.zip$")
+
+
+IN_MEMORY_ARCHIVE_LIMIT = 16 * 1024 * 1024
+ARCHIVE_MEMORY_BUDGET = 64 * 1024 * 1024
+MAX_IMAGE_BYTES = 4 * 1024 * 1024
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+
+class MemoryBudget:
+    """Process-wide cap on bytes held in memory by in-flight downloads."""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.used = 0
+        self._lock = threading.Lock()
+
+    def try_reserve(self, amount: int) -> bool:
+        with self._lock:
+            if self.used + amount > self.limit:
+                return False
+            self.used += amount
+            return True
+
+    def release(self, amount: int) -> None:
+        with self._lock:
+            self.used = max(0, self.used - amount)
+
+
+archive_memory_budget = MemoryBudget(ARCHIVE_MEMORY_BUDGET)
+
+
+class SpillBuffer:
+    """Keeps a download in memory and spills it to a temp file once it outgrows ``limit``.
+
+    In-memory bytes are also reserved from a shared :class:`MemoryBudget`, so many
+    concurrent jobs spill to disk instead of growing memory past the budget.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        tag: str,
+        limit: int = IN_MEMORY_ARCHIVE_LIMIT,
+        budget: MemoryBudget | None = None,
+    ):
+        self.directory = directory
+        self.tag = tag
+        self.limit = limit
+        self.budget = archive_memory_budget if budget is None else budget
+        self.size = 0
+        self.spill_path: str | None = None
+        self._memory: io.BytesIO | None = io.BytesIO()
+        self._reserved = 0
+        self._file = None
+
+    @property
+    def in_memory(self) -> bool:
+        return self._memory is not None
+
+    def expect(self, total: int) -> None:
+        """Spill up front when the announced length is already over the limit."""
+        if total > self.limit:
+            self._spill()
+
+    def write(self, data: bytes) -> None:
+        if self._memory is not None and (
+            self.size + len(data) > self.limit or not self.budget.try_reserve(len(data))
+        ):
+            self._spill()
+        if self._memory is not None:
+            self._reserved += len(data)
+            self._memory.write(data)
+        else:
+            self._file.write(data)
+        self.size += len(data)
+
+    def _spill(self) -> None:
+        if self._memory is None:
+            return
+        fd, self.spill_path = tempfile.mkstemp(
+            dir=self.directory, prefix=f"{TEMP_PREFIX}{self.tag}-", suffix=".part"
+        )
+        self._file = os.fdopen(fd, "w+b")
+        with self._memory.getbuffer() as view:
+            self._file.write(view)
+        self._memory.close()
+        self._memory = None
+        self._release_reservation()
+
+    def _release_reservation(self) -> None:
+        if self._reserved:
+            self.budget.release(self._reserved)
+            self._reserved = 0
+
+    def reader(self):
+        """Return a seekable binary handle over the buffered payload, positioned at 0."""
+        if self._memory is not None:
+            self._memory.seek(0)
+            return self._memory
+        self._file.flush()
+        self._file.seek(0)
+        return self._file
+
+    def close(self) -> None:
+        if self._memory is not None:
+            self._memory.close()
+            self._memory = None
+        self._release_reservation()
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.spill_path is not None:
+            try:
+                os.remove(self.spill_path)
+            except OSError:
+                pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def _file_digest(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as handle:
+        for block in iter(lambda: handle.read(DOWNLOAD_CHUNK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_SYNC = 1
+PRIORITY_METADATA = 2
+DEFAULT_HOST_CONCURRENCY = 4
+HOST_CONCURRENCY = {
+    "proxy.pipers.cn": 2,
+    "api-psi-eight-12.vercel.app": 3,
+}
+
+
+class TokenBucket:
+    """Global byte-rate limiter; ``rate`` <= 0 disables throttling."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.capacity = max(rate, DOWNLOAD_CHUNK_SIZE)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, amount: int) -> None:
+        if self.rate <= 0 or amount <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            # 允许透支，后来者按欠额等待，保证长期速率不超过上限
+            self.tokens -= amount
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+class NetworkScheduler:
+    """Single gate for outgoing requests: per-host caps, priority classes and fair order across jobs."""
+
+    def __init__(
+        self,
+        rate_limit: float = 0,
+        host_limits: dict[str, int] | None = None,
+        default_host_limit: int = DEFAULT_HOST_CONCURRENCY,
+    ):
+        self.bucket = TokenBucket(rate_limit)
+        self.host_limits = dict(HOST_CONCURRENCY if host_limits is None else host_limits)
+        self.default_host_limit = default_host_limit
+        self._cond = threading.Condition()
+        self._in_flight: dict[str, int] = defaultdict(int)
+        self._waiting: dict[str, list[tuple[int, int, str]]] = defaultdict(list)
+        self._served: dict[str, int] = defaultdict(int)
+        self._seq = itertools.count()
+
+    def set_rate_limit(self, rate_limit: float) -> None:
+        self.bucket = TokenBucket(rate_limit)
+
+    def _host_limit(self, host: str) -> int:
+        return max(1, self.host_limits.get(host, self.default_host_limit))
+
+    def _next_waiter(self, host: str) -> tuple[int, int, str]:
+        # 在放行时按各任务当前已获得的请求数挑选，同优先级内实现任务间轮转
+        return min(
+            self._waiting[host],
+            key=lambda entry: (entry[0], self._served[entry[2]], entry[1]),
+        )
+
+    @contextmanager
+    def slot(self, url: str, priority: int = PRIORITY_INTERACTIVE, job: str | None = None):
+        """Hold one in-flight slot for the URL's host for the duration of the block."""
+        host = urlsplit(url).hostname or ""
+        job = job or ""
+        with self._cond:
+            entry = (priority, next(self._seq), job)
+            self._waiting[host].append(entry)
+            while (
+                self._in_flight[host] >= self._host_limit(host)
+                or self._next_waiter(host) is not entry
+            ):
+                self._cond.wait()
+            self._waiting[host].remove(entry)
+            self._in_flight[host] += 1
+            self._served[job] += 1
+            self._cond.notify_all()
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight[host] -= 1
+                if not self._waiting[host] and not self._in_flight[host]:
+                    del self._waiting[host]
+                    del self._in_flight[host]
+                self._cond.notify_all()
+
+    def get(
+        self,
+        url: str,
+        priority: int = PRIORITY_INTERACTIVE,
+        job: str | None = None,
+        **kwargs,
+    ) -> requests.Response:
+        """Non-streaming GET through the scheduler; the body counts against the bandwidth limit."""
+        with self.slot(url, priority, job):
+            response = requests.get(url, **kwargs)
+            self.bucket.consume(len(response.content))
+        return response
+
+    def probe(
+        self,
+        url: str,
+        priority: int = PRIORITY_INTERACTIVE,
+        job: str | None = None,
+        **kwargs,
+    ) -> int:
+        """Return the status code without reading the response body."""
+        with self.slot(url, priority, job), requests.get(url, stream=True, **kwargs) as response:
+            return response.status_code
+
+    def get_limited(
+        self,
+        url: str,
+        max_bytes: int,
+        priority: int = PRIORITY_INTERACTIVE,
+        job: str | None = None,
+        **kwargs,
+    ) -> bytes | None:
+        """Stream a small body, giving up (``None``) once it exceeds ``max_bytes``."""
+        with self.slot(url, priority, job), requests.get(url, stream=True, **kwargs) as response:
+            response.raise_for_status()
+            content_length = response.headers.get("Content-Length", "")
+            if content_length.isdigit() and int(content_length) > max_bytes:
+                return None
+            body = bytearray()
+            for chunk in self.iter_content(response):
+                body += chunk
+                if len(body) > max_bytes:
+                    return None
+            return bytes(body)
+
+    def iter_content(self, response: requests.Response, chunk_size: int = DOWNLOAD_CHUNK_SIZE):
+        for chunk in response.iter_content(chunk_size=chunk_size):
+            if chunk:
+                self.bucket.consume(len(chunk))
+                yield chunk
+
+    def finish_job(self, job: str) -> None:
+        with self._cond:
+            self._served.pop(job, None)
+
+
+JOB_DB_PATH = Path("./jobs.sqlite3")
+JOB_PENDING = "pending"
+JOB_RUNNING = "running"
+JOB_DONE = "done"
+JOB_FAILED = "failed"
+PROGRESS_RECORD_INTERVAL = 4 * 1024 * 1024
+IMPORT_BATCH_SIZE = 50
+
+
+class JobStore:
+    """SQLite-backed job queue recording each AppID's state, attempts, last error and offset."""
+
+    def __init__(self, path: Path = JOB_DB_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    appid TEXT PRIMARY KEY,
+                    source TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    last_error TEXT,
+                    bytes_done INTEGER NOT NULL DEFAULT 0,
+                    queued_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    priority INTEGER NOT NULL DEFAULT 0
+                )
+                """
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "priority" not in columns:
+                conn.execute("ALTER TABLE jobs ADD COLUMN priority INTEGER NOT NULL DEFAULT 0")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, timeout=10)
+        conn.execute("PRAGMA journal_mode=WAL")
+        return conn
+
+    def _execute(self, sql: str, params: tuple = ()) -> list[tuple]:
+        with self._lock:
+            conn = self._connect()
+            try:
+                with conn:
+                    return conn.execute(sql, params).fetchall()
+            finally:
+                conn.close()
+
+    def enqueue(self, appid: str, source: str, priority: int = PRIORITY_INTERACTIVE) -> bool:
+        """Queue an AppID; returns ``False`` when it is already running and was left alone."""
+        now = time.time()
+        rows = self._execute(
+            """
+            INSERT INTO jobs (appid, source, state, queued_at, updated_at, priority)
+            VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(appid) DO UPDATE SET
+                source = excluded.source,
+                state = excluded.state,
+                queued_at = excluded.queued_at,
+                updated_at = excluded.updated_at,
+                priority = excluded.priority
+            WHERE jobs.state != ?
+            RETURNING appid
+            """,
+            (appid, source, JOB_PENDING, now, now, priority, JOB_RUNNING),
+        )
+        return bool(rows)
+
+    def claim_next(self) -> tuple[str, str, int] | None:
+        """Mark the next pending job as running and return ``(appid, source, priority)``.
+
+        Interactive jobs go before batch/sync jobs; within a class, oldest first.
+        """
+        rows = self._execute(
+            """
+            UPDATE jobs SET state = ?, attempts = attempts + 1, updated_at = ?
+            WHERE appid = (
+                SELECT appid FROM jobs WHERE state = ?
+                ORDER BY priority, queued_at LIMIT 1
+            )
+            RETURNING appid, source, priority
+            """,
+            (JOB_RUNNING, time.time(), JOB_PENDING),
+        )
+        return rows[0] if rows else None
+
+    def finish(self, appid: str, success: bool, error: str | None = None) -> None:
+        self._execute(
+            """
+            UPDATE jobs SET state = ?, last_error = ?,
+                bytes_done = CASE WHEN ? THEN 0 ELSE bytes_done END, updated_at = ?
+            WHERE appid = ?
+            """,
+            (
+                JOB_DONE if success else JOB_FAILED,
+                None if success else error,
+                success,
+                time.time(),
+                appid,
+            ),
+        )
+
+    def record_progress(self, appid: str, bytes_done: int) -> None:
+        # 进度仅供参考，数据库出错不应中断下载
+        try:
+            self._execute(
+                "UPDATE jobs SET bytes_done = ?, updated_at = ? WHERE appid = ?",
+                (bytes_done, time.time(), appid),
+            )
+        except sqlite3.Error:
+            pass
+
+    def recover_interrupted(self) -> int:
+        """Requeue jobs left running by a crash or exit; returns the number of pending jobs."""
+        self._execute(
+            "UPDATE jobs SET state = ?, updated_at = ? WHERE state = ?",
+            (JOB_PENDING, time.time(), JOB_RUNNING),
+        )
+        return self.count(JOB_PENDING)
+
+    def defer_pending(self, reason: str) -> int:
+        """Park all pending jobs as failed so they only run again via retry."""
+        rows = self._execute(
+            """
+            UPDATE jobs SET state = ?, last_error = ?, updated_at = ?
+            WHERE state = ? RETURNING appid
+            """,
+            (JOB_FAILED, reason, time.time(), JOB_PENDING),
+        )
+        return len(rows)
+
+    def retry_failed(self) -> int:
+        rows = self._execute(
+            """
+            UPDATE jobs SET state = ?, queued_at = ?, updated_at = ?
+            WHERE state = ? RETURNING appid
+            """,
+            (JOB_PENDING, time.time(), time.time(), JOB_FAILED),
+        )
+        return len(rows)
+
+    def count(self, state: str) -> int:
+        return self._execute("SELECT COUNT(*) FROM jobs WHERE state = ?", (state,))[0][0]
+
+
+def artifact_tag(appid: str) -> str:
+    return re.sub(r"[^0-9A-Za-z_]", "_", appid) or "_"
+
+
+@contextmanager
+def atomic_output(final_path: str, tag: str):
+    """Write through a unique temp file that is fsynced and renamed over ``final_path``."""
+    directory = os.path.dirname(os.path.abspath(final_path))
+    fd, temp_path = tempfile.mkstemp(
+        dir=directory, prefix=f"{TEMP_PREFIX}{tag}-", suffix=".part"
+    )
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            yield handle
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(temp_path, final_path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+def _try_lock_fd(fd: int) -> bool:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+    except OSError:
+        return False
+    return True
+
+
+def _unlock_fd(fd: int) -> None:
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+        else:
+            os.lseek(fd, 0, os.SEEK_SET)
+            msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    except OSError:
+        pass
+
+
+class AppIdLock:
+    """Per-AppID lock held in-process and as an OS lock on ``download/.locks/<appid>.lock``.
+
+    The OS lock dies with the process, so a crash never leaves the AppID locked.
+    Lock files themselves are left in place; only the lock on them matters.
+    """
+
+    _registry: dict[str, threading.Lock] = {}
+    _registry_guard = threading.Lock()
+
+    def __init__(self, download_root: str, appid: str):
+        self.appid = appid
+        tag = artifact_tag(appid)
+        self.lock_path = os.path.join(download_root, LOCK_DIR_NAME, f"{tag}.lock")
+        with self._registry_guard:
+            self._thread_lock = self._registry.setdefault(tag, threading.Lock())
+        self._fd: int | None = None
+
+    def acquire(self) -> bool:
+        if not self._thread_lock.acquire(blocking=False):
+            return False
+        try:
+            os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+            fd = os.open(self.lock_path, os.O_CREAT | os.O_RDWR)
+        except OSError:
+            self._thread_lock.release()
+            return False
+        if not _try_lock_fd(fd):
+            os.close(fd)
+            self._thread_lock.release()
+            return False
+        if fcntl is not None:
+            # 仅供排查时查看持有者；Windows 上锁定区域不可写，跳过
+            os.ftruncate(fd, 0)
+            os.write(fd, str(os.getpid()).encode("ascii"))
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        fd, self._fd = self._fd, None
+        _unlock_fd(fd)
+        os.close(fd)
+        self._thread_lock.release()
+
+    def __enter__(self):
+        if not self.acquire():
+            raise RuntimeError(f"AppID {self.appid} 正在被其他任务处理，请稍后再试。")
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+
+def is_appid_locked(download_root: str, tag: str) -> bool:
+    """Probe whether any live job (in this or another process) holds the AppID lock."""
+    lock = AppIdLock(download_root, tag)
+    if not os.path.exists(lock.lock_path):
+        return False
+    if not lock.acquire():
+        return True
+    lock.release()
+    return False
+
+
+def sweep_orphaned_artifacts(download_root: str) -> list[str]:
+    """Remove temp files, staging dirs and leftover zips whose AppID no live job holds."""
+    removed: list[str] = []
+    try:
+        entries = list(os.scandir(download_root))
+    except OSError:
+        return removed
+    # 解压时的临时文件落在各游戏目录内；目录可能无法读取或已被删除，逐个跳过
+    nested = []
+    for folder in entries:
+        try:
+            if not folder.is_dir(follow_symlinks=False) or folder.name.startswith("."):
+                continue
+            with os.scandir(folder.path) as children:
+                nested.extend(child for child in children if child.name.startswith(TEMP_PREFIX))
+        except OSError:
+            continue
+    entries.extend(nested)
+    for entry in entries:
+        try:
+            if entry.name.startswith(TEMP_PREFIX):
+                tag = entry.name[len(TEMP_PREFIX) :].split("-", 1)[0]
+            elif entry.name.endswith("_staging") and entry.is_dir():
+                tag = None
+            else:
+                match = LEGACY_ARTIFACT_PATTERN.match(entry.name)
+                if match is None or not entry.is_file():
+                    continue
+                tag = match.group("tag")
+        except OSError:
+            continue
+        if tag is not None and is_appid_locked(download_root, tag):
+            continue
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path)
+            else:
+                os.remove(entry.path)
+            removed.append(entry.path)
+        except OSError:
+            pass
+    return removed
+
+
+LOG_QUEUE_INTERVAL_MS = 100
+PROFILE_SAMPLE_INTERVAL = 0.01
+PROFILE_FLUSH_SECONDS = 60
+PROFILE_RESERVOIR_SIZE = 10_000
+PROFILED_METHODS = (
+    "log",
+    "_update_game_image",
+    "_refresh_background_image",
+    "_collect_game_info",
+    "_check_domestic_url",
+    "_find_first_valid_node",
+    "_download_file_stream",
+    "_process_downloaded_archive",
+    "_import_lua_batch",
+)
+
+
+class SampleStats:
+    """Streaming count/total/max plus a fixed-size reservoir sample for percentiles."""
+
+    def __init__(self, capacity: int = PROFILE_RESERVOIR_SIZE):
+        self.capacity = capacity
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.reservoir: list[float] = []
+
+    def add(self, value: float) -> None:
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        if len(self.reservoir) < self.capacity:
+            self.reservoir.append(value)
+        else:
+            slot = random.randrange(self.count)
+            if slot < self.capacity:
+                self.reservoir[slot] = value
+
+    def summary(self, scale: float = 1, unit: str = "") -> str:
+        if not self.count:
+            return "无数据"
+        values = sorted(self.reservoir)
+
+        def pick(fraction: float) -> float:
+            return values[min(len(values) - 1, int(fraction * len(values)))] * scale
+
+        return (
+            f"p50 {pick(0.5):.1f}{unit}，p95 {pick(0.95):.1f}{unit}，"
+            f"最大 {self.max * scale:.1f}{unit}"
+        )
+
+
+class SamplingProfiler:
+    """Opt-in sampler writing collapsed stacks, event-loop lag and stage timings to ``log/``."""
+
+    def __init__(self, log_dir: str, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.log_dir = log_dir
+        self.interval = interval
+        stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        self.collapsed_path = os.path.join(log_dir, f"{stamp}.profile.collapsed")
+        self.summary_path = os.path.join(log_dir, f"{stamp}.profile.txt")
+        self.stacks: dict[str, int] = defaultdict(int)
+        self.timings: dict[str, SampleStats] = defaultdict(SampleStats)
+        self.loop_lags = SampleStats()
+        self.samples = 0
+        self.started_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread.is_alive() and self._thread is not threading.current_thread():
+            self._thread.join(timeout=1)
+        self.flush()
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        last_flush = time.monotonic()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            frames = sys._current_frames()
+            with self._lock:
+                self.samples += 1
+                for thread_id, frame in frames.items():
+                    if thread_id == own_id:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        code = frame.f_code
+                        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)})")
+                        frame = frame.f_back
+                    stack.append(names.get(thread_id, str(thread_id)))
+                    self.stacks[";".join(reversed(stack))] += 1
+            if time.monotonic() - last_flush >= PROFILE_FLUSH_SECONDS:
+                self.flush()
+                last_flush = time.monotonic()
+
+    def record_loop_lag(self, lag: float) -> None:
+        with self._lock:
+            self.loop_lags.add(lag)
+
+    def wrap(self, name: str, func):
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                with self._lock:
+                    self.timings[name].add(elapsed)
+
+        return timed
+
+    def flush(self) -> None:
+        with self._lock:
+            stacks = dict(self.stacks)
+            timing_lines = [
+                f"  {name}: 次数 {stats.count}，合计 {stats.total:.3f}s，"
+                + stats.summary(scale=1000, unit="ms")
+                for name, stats in sorted(self.timings.items(), key=lambda item: -item[1].total)
+            ]
+            lag_line = "  " + self.loop_lags.summary(scale=1000, unit="ms")
+            samples = self.samples
+        lines = [
+            f"采样时长 {time.monotonic() - self.started_at:.1f}s，"
+            f"采样 {samples} 次，间隔 {self.interval * 1000:.0f}ms",
+            "",
+            f"Tk 事件循环延迟（_process_log_queue 相对 {LOG_QUEUE_INTERVAL_MS}ms 计划）:",
+            lag_line,
+            "",
+            "阶段耗时:",
+            *timing_lines,
+            "",
+            "热点栈（前 20）:",
+        ]
+        for stack, count in sorted(stacks.items(), key=lambda item: -item[1])[:20]:
+            lines.append(f"  {count:>6}  {stack}")
+        try:
+            with atomic_output(self.collapsed_path, "profile") as handle:
+                handle.write(
+                    "".join(f"{stack} {count}\n" for stack, count in stacks.items()).encode("utf-8")
+                )
+            with atomic_output(self.summary_path, "profile") as handle:
+                handle.write(("\n".join(lines) + "\n").encode("utf-8"))
+        except OSError:
+            pass
+
+
+LIBRARY_INDEX_NAME = ".library_index.json"
+LIBRARY_POLL_MS = 2000
+LIBRARY_VISIBLE_ROWS = 18
+LIBRARY_COLUMNS = (
+    ("appid", "AppID", 80),
+    ("name", "名称", 220),
+    ("files", "文件数", 60),
+    ("size", "大小", 80),
+    ("synced", "最后同步", 130),
+    ("imported", "入库", 50),
+)
+
+
+class LibraryIndex:
+    """Incremental index of ``download/`` keyed by game folder, rescanning only folders whose mtime changed."""
+
+    def __init__(self, download_root: str):
+        self.download_root = download_root
+        self.index_path = os.path.join(download_root, LIBRARY_INDEX_NAME)
+        self.entries: dict[str, dict] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as handle:
+                self.entries = json.load(handle).get("entries", {})
+        except (OSError, json.JSONDecodeError, AttributeError):
+            self.entries = {}
+
+    def save(self) -> None:
+        payload = json.dumps({"entries": self.entries}, ensure_ascii=False).encode("utf-8")
+        try:
+            with atomic_output(self.index_path, "library") as handle:
+                handle.write(payload)
+        except OSError:
+            pass
+
+    def refresh(self, force: bool = False) -> tuple[dict[str, dict], set[str]]:
+        """Bring the index up to date; returns ``(updated entries, removed folder names)``.
+
+        Blocking filesystem work: call it from a worker thread, one refresh at a time.
+        """
+        updated: dict[str, dict] = {}
+        if not os.path.isdir(self.download_root):
+            removed = set(self.entries)
+            self.entries = {}
+            return updated, removed
+        seen: set[str] = set()
+        try:
+            folders = list(os.scandir(self.download_root))
+        except OSError:
+            return updated, set()
+        for entry in folders:
+            if entry.name.startswith(".") or not entry.is_dir(follow_symlinks=False):
+                continue
+            try:
+                mtime = entry.stat().st_mtime
+            except OSError:
+                continue
+            cached = self.entries.get(entry.name)
+            if not force and cached is not None and cached.get("mtime") == mtime:
+                seen.add(entry.name)
+                continue
+            # 目录可能在两次扫描之间被删除（本地库删除、启动清扫或用户手动操作）
+            try:
+                updated[entry.name] = self._scan_folder(entry.path, entry.name, mtime)
+            except OSError:
+                continue
+            seen.add(entry.name)
+        removed = set(self.entries) - seen
+        for name in removed:
+            del self.entries[name]
+        self.entries.update(updated)
+        if updated or removed:
+            self.save()
+        return updated, removed
+
+    @staticmethod
+    def _scan_folder(path: str, name: str, mtime: float) -> dict:
+        appids: list[str] = []
+        file_count = 0
+        total_size = 0
+        last_sync = mtime
+        for child in os.scandir(path):
+            if child.name.startswith(TEMP_PREFIX) or not child.is_file():
+                continue
+            stat = child.stat()
+            file_count += 1
+            total_size += stat.st_size
+            last_sync = max(last_sync, stat.st_mtime)
+            stem, suffix = os.path.splitext(child.name)
+            if suffix.lower() == ".lua" and stem.isdigit():
+                appids.append(stem)
+        appids.sort(key=int)
+        return {
+            "appid": appids[0] if appids else "",
+            "name": name,
+            "files": file_count,
+            "size": total_size,
+            "synced": last_sync,
+            "mtime": mtime,
+        }
+
+
+def format_size(size: int) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+class LibraryWindow:
+    """Virtualized Treeview over :class:`LibraryIndex`; only the visible rows exist as Tk items."""
+
+    def __init__(self, app: "SteamManifestDownloader"):
+        self.app = app
+        self.download_root = os.path.join(os.getcwd(), "download")
+        self.index: LibraryIndex | None = None
+        # 界面线程只读写这份副本；索引本身只在后台线程中刷新
+        self.entries: dict[str, dict] = {}
+        self.rows: list[str] = []
+        self.offset = 0
+        self.selected: set[str] = set()
+        self.sort_key = "name"
+        self.sort_reverse = False
+        self.filter_var = tk.StringVar()
+        self.status_var = tk.StringVar()
+        self._imported: set[str] = set()
+        # 以下三项只在 library-index 线程中读写
+        self._plugin_dir: Path | None = None
+        self._plugin_mtime: int | None = None
+        self._steam_missing = False
+        self._poll_job: str | None = None
+        self._rendering = False
+        self._refreshing = False
+        self._force_pending = False
+        self._closed = False
+
+        self.window = tk.Toplevel(app.root)
+        self.window.title("本地库")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self._build()
+        self.status_var.set("正在加载本地库...")
+        self.refresh()
+
+    def _build(self) -> None:
+        top = ttk.Frame(self.window)
+        top.pack(fill="x", padx=10, pady=(10, 5))
+        ttk.Label(top, text="筛选:").pack(side="left")
+        filter_entry = ttk.Entry(top, textvariable=self.filter_var)
+        filter_entry.pack(side="left", fill="x", expand=True, padx=5)
+        self.filter_var.trace_add("write", lambda *_: self._apply_view())
+        ttk.Button(top, text="刷新", command=lambda: self.refresh(force=True)).pack(side="left")
+
+        body = ttk.Frame(self.window)
+        body.pack(fill="both", expand=True, padx=10, pady=5)
+        self.tree = ttk.Treeview(
+            body,
+            columns=[key for key, _, _ in LIBRARY_COLUMNS],
+            show="headings",
+            height=LIBRARY_VISIBLE_ROWS,
+            selectmode="extended",
+        )
+        for key, title, width in LIBRARY_COLUMNS:
+            self.tree.heading(key, text=title, command=lambda k=key: self._sort_by(k))
+            self.tree.column(key, width=width, anchor="w")
+        self.scrollbar = ttk.Scrollbar(body, orient="vertical", command=self._on_scrollbar)
+        self.tree.pack(side="left", fill="both", expand=True)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
+        self.tree.bind("<MouseWheel>", self._on_wheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_to(self.offset - 3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_to(self.offset + 3))
+        self.tree.bind("<Configure>", lambda e: self._render())
+
+        actions = ttk.Frame(self.window)
+        actions.pack(fill="x", padx=10, pady=(5, 10))
+        ttk.Button(actions, text="全选", command=self._select_all).pack(side="left")
+        ttk.Button(actions, text="重新同步", command=self.resync_selected).pack(side="left", padx=5)
+        ttk.Button(actions, text="入库", command=self.import_selected).pack(side="left")
+        ttk.Button(actions, text="删除", command=self.delete_selected).pack(side="left", padx=5)
+        ttk.Label(actions, textvariable=self.status_var).pack(side="right")
+
+    def close(self) -> None:
+        self._closed = True
+        if self._poll_job is not None:
+            self.window.after_cancel(self._poll_job)
+            self._poll_job = None
+        self.window.destroy()
+        self.app.library_window = None
+
+    def _poll(self) -> None:
+        self._poll_job = None
+        self.refresh()
+
+    def refresh(self, force: bool = False) -> None:
+        """Start a background index refresh; the next poll is scheduled once it lands."""
+        if self._refreshing:
+            self._force_pending = self._force_pending or force
+            return
+        self._refreshing = True
+        threading.Thread(
+            target=self._refresh_worker, args=(force,), name="library-index", daemon=True
+        ).start()
+
+    def _refresh_worker(self, force: bool) -> None:
+        updated: dict[str, dict] = {}
+        removed: set[str] = set()
+        imported: set[str] | None = None
+        try:
+            if self.index is None:
+                self.index = LibraryIndex(self.download_root)
+                updated.update(self.index.entries)
+            # 只比对目录 mtime，真正变化的目录才会重新扫描
+            changes, removed = self.index.refresh(force=force)
+            updated.update(changes)
+            for name in removed:
+                updated.pop(name, None)
+            imported = self._imported_appids(force)
+        except Exception as exc:  # noqa: BLE001
+            self.app._enqueue_log(f"本地库刷新失败：{exc}")
+        self.app.root.after(0, lambda: self._on_refreshed(updated, removed, imported))
+
+    def _on_refreshed(
+        self, updated: dict[str, dict], removed: set[str], imported: set[str] | None
+    ) -> None:
+        self._refreshing = False
+        if self._closed:
+            return
+        for name in removed:
+            self.entries.pop(name, None)
+        self.entries.update(updated)
+        imported_changed = imported is not None and imported != self._imported
+        if imported is not None:
+            self._imported = imported
+        if updated or removed or imported_changed or not self.rows:
+            self._apply_view()
+        if self._force_pending:
+            self._force_pending = False
+            self.refresh(force=True)
+            return
+        self._poll_job = self.window.after(LIBRARY_POLL_MS, self._poll)
+
+    def _imported_appids(self, force: bool = False) -> set[str] | None:
+        """Return the AppIDs in stplug-in, or ``None`` when its mtime is unchanged."""
+        if force:
+            self._plugin_dir = None
+            self._steam_missing = False
+        if self._plugin_dir is None:
+            # 找不到 Steam 时记住结果，直到用户手动刷新，避免每次轮询都重新探测
+            if self._steam_missing:
+                return None
+            try:
+                self._plugin_dir = self.app._get_steam_root() / "config" / "stplug-in"
+            except (OSError, RuntimeError):
+                self._steam_missing = True
+                return set()
+            force = True
+        try:
+            mtime = os.stat(self._plugin_dir).st_mtime_ns
+        except OSError:
+            mtime = None
+        if mtime == self._plugin_mtime and not force:
+            return None
+        self._plugin_mtime = mtime
+        if mtime is None:
+            return set()
+        try:
+            with os.scandir(self._plugin_dir) as entries:
+                return {entry.name[:-4] for entry in entries if entry.name.endswith(".lua")}
+        except OSError:
+            self._plugin_mtime = None
+            return set()
+
+    def _apply_view(self) -> None:
+        keyword = self.filter_var.get().strip().lower()
+        entries = self.entries
+        rows = [
+            name
+            for name, entry in entries.items()
+            if not keyword or keyword in name.lower() or keyword in entry.get("appid", "")
+        ]
+        if self.sort_key in ("files", "size", "synced"):
+            rows.sort(key=lambda n: entries[n].get(self.sort_key, 0), reverse=self.sort_reverse)
+        elif self.sort_key == "appid":
+            rows.sort(key=lambda n: int(entries[n].get("appid") or 0), reverse=self.sort_reverse)
+        else:
+            rows.sort(key=str.lower, reverse=self.sort_reverse)
+        self.rows = rows
+        self.selected &= set(entries)
+        self._scroll_to(self.offset)
+
+    def _sort_by(self, key: str) -> None:
+        self.sort_reverse = not self.sort_reverse if self.sort_key == key else False
+        self.sort_key = key
+        self._apply_view()
+
+    def _visible_count(self) -> int:
+        return max(1, int(self.tree.cget("height")))
+
+    def _scroll_to(self, offset: int) -> None:
+        self.offset = max(0, min(offset, len(self.rows) - self._visible_count()))
+        self._render()
+
+    def _on_scrollbar(self, action: str, value: str, unit: str | None = None) -> None:
+        if action == "moveto":
+            self._scroll_to(int(float(value) * len(self.rows)))
+        elif action == "scroll":
+            step = self._visible_count() if unit == "pages" else 1
+            self._scroll_to(self.offset + int(value) * step)
+
+    def _on_wheel(self, event) -> str:
+        self._scroll_to(self.offset - int(event.delta / 120) * 3)
+        return "break"
+
+    def _render(self) -> None:
+        visible = self.rows[self.offset : self.offset + self._visible_count()]
+        self._rendering = True
+        try:
+            self.tree.delete(*self.tree.get_children())
+            for name in visible:
+                entry = self.entries[name]
+                appid = entry.get("appid", "")
+                self.tree.insert(
+                    "",
+                    "end",
+                    iid=name,
+                    values=(
+                        appid,
+                        name,
+                        entry.get("files", 0),
+                        format_size(entry.get("size", 0)),
+                        datetime.fromtimestamp(entry.get("synced", 0)).strftime("%Y-%m-%d %H:%M"),
+                        "是" if appid and appid in self._imported else "否",
+                    ),
+                )
+            self.tree.selection_set([name for name in visible if name in self.selected])
+        finally:
+            self._rendering = False
+        total = len(self.rows)
+        if total:
+            self.scrollbar.set(self.offset / total, (self.offset + len(visible)) / total)
+        else:
+            self.scrollbar.set(0, 1)
+        self.status_var.set(f"共 {total} 项，已选 {len(self.selected)} 项")
+
+    def _on_select(self, _event=None) -> None:
+        if self._rendering:
+            return
+        visible = set(self.tree.get_children())
+        self.selected -= visible
+        self.selected |= set(self.tree.selection())
+        self.status_var.set(f"共 {len(self.rows)} 项，已选 {len(self.selected)} 项")
+
+    def _select_all(self) -> None:
+        self.selected = set(self.rows)
+        self._render()
+
+    def _selected_appids(self) -> list[str]:
+        appids = [self.entries[name].get("appid") for name in self.selected]
+        return [appid for appid in appids if appid]
+
+    def resync_selected(self) -> None:
+        appids = self._selected_appids()
+        if not appids:
+            return
+        source = self.app.download_source.get()
+        queued = running = 0
+        for appid in appids:
+            try:
+                if self.app.job_store.enqueue(appid, source, PRIORITY_SYNC):
+                    queued += 1
+                else:
+                    running += 1
+            except sqlite3.Error as exc:
+                self.app.log(f"本地库：无法将 AppID {appid} 加入队列：{exc}")
+        if running:
+            self.app.log(f"本地库：{running} 个 AppID 正在下载中，已跳过")
+        if not queued:
+            return
+        self.app.log(f"本地库：已将 {queued} 个 AppID 加入同步队列")
+        self.app._ensure_job_worker()
+
+    def import_selected(self) -> None:
+        appids = self._selected_appids()
+        if not appids:
+            return
+
+        folders = {
+            self.entries[name]["appid"]: os.path.join(self.download_root, name)
+            for name in self.selected
+            if self.entries[name].get("appid")
+        }
+
+        def worker():
+            self.app._import_lua_batch(appids, folders)
+            self.app.root.after(0, lambda: self.refresh(force=True))
+
+        threading.Thread(target=worker, name="library-import", daemon=True).start()
+
+    def delete_selected(self) -> None:
+        names = sorted(self.selected)
+        if not names:
+            return
+        if not messagebox.askyesno(
+            "删除", f"确定删除选中的 {len(names)} 个目录吗？", parent=self.window
+        ):
+            return
+        targets = [(name, self.entries[name].get("appid", "")) for name in names]
+        self.selected.clear()
+        self.status_var.set(f"正在删除 {len(targets)} 个目录...")
+        threading.Thread(
+            target=self._delete_worker, args=(targets,), name="library-delete", daemon=True
+        ).start()
+
+    def _delete_worker(self, targets: list[tuple[str, str]]) -> None:
+        deleted = 0
+        for name, appid in targets:
+            path = os.path.join(self.download_root, name)
+            # 持有 AppID 锁再删除，避免与正在解压到该目录的任务冲突
+            lock = AppIdLock(self.download_root, appid) if appid else None
+            if lock is not None and not lock.acquire():
+                self.app._enqueue_log(f"跳过 {name}：AppID {appid} 正在下载中")
+                continue
+            try:
+                shutil.rmtree(path)
+                deleted += 1
+            except OSError as exc:
+                self.app._enqueue_log(f"删除 {name} 失败：{exc}")
+            finally:
+                if lock is not None:
+                    lock.release()
+        self.app._enqueue_log(f"本地库：已删除 {deleted} 个目录")
+        self.app.root.after(0, self.refresh)
 
 
 class SteamManifestDownloader:
     """UI shell showing the layout without backend functionality."""
 
-    def __init__(self, root: tk.Tk):
+    def __init__(self, root: tk.Tk, profile: bool = False):
         self.root = root
         self.root.title("Steam Manifest 下载器 & 自动入库工具 作者: ecxwxz")
         self.root.iconbitmap(default="1.ico")
         self.root.resizable(True, True)
         self.settings = self.load_settings()
+        self.scheduler = NetworkScheduler(
+            rate_limit=self.settings.get("bandwidth_limit_kib", 0) * 1024
+        )
         self.download_source = tk.StringVar(
             value=self.settings.get("download_source", "domestic")
         )
         self.auto_import = tk.BooleanVar(
             value=self.settings.get("auto_import", False)
         )
+        self.bandwidth_limit = tk.IntVar(
+            value=self.settings.get("bandwidth_limit_kib", 0)
+        )
+        self.profiling = tk.BooleanVar(
+            value=profile or self.settings.get("profiling", False)
+        )
+        self.profiler: SamplingProfiler | None = None
         self.auto_import_status = tk.StringVar(
             value="开启" if self.auto_import.get() else "关闭"
         )
         self.current_task: threading.Thread | None = None
+        job_store_error: sqlite3.Error | None = None
+        try:
+            self.job_store = JobStore()
+        except sqlite3.Error as exc:
+            # 工作目录下的队列库不可用时退回临时目录，队列只在本次运行内保留
+            job_store_error = exc
+            self.job_store = JobStore(
+                Path(tempfile.mkdtemp(prefix="stm-jobs-")) / JOB_DB_PATH.name
+            )
+        self._worker_lock = threading.Lock()
+        self._sweep_done = threading.Event()
+        self._job_local = threading.local()
         self.log_queue: queue.Queue[str] = queue.Queue()
         self.log_dir = os.path.join(os.getcwd(), "log")
         os.makedirs(self.log_dir, exist_ok=True)
@@ -86,8 +1334,14 @@ class SteamManifestDownloader:
         self._background_size = (0, 0)
         self.progress_animating = False
         self.current_game_folder: Optional[str] = None
+        self.library_window: LibraryWindow | None = None
+        self._steam_root: Optional[Path] = None
+        self._steam_root_lock = threading.Lock()
         self._setup_background()
         self.create_widgets()
+        if job_store_error is not None:
+            self.log(f"任务队列数据库不可用，本次改用临时队列：{job_store_error}")
+        self._sweep_download_root()
         if self.background_label is not None:
             self.background_label.lower()
         self.root.update_idletasks()
@@ -98,7 +1352,12 @@ class SteamManifestDownloader:
         self.root.minsize(width, height)
         self.root.resizable(False, False)
         self.log_area.configure(state="disabled")
-        self.root.after(100, self._process_log_queue)
+        self.root.protocol("WM_DELETE_WINDOW", self.shutdown)
+        if self.profiling.get():
+            self._start_profiler()
+        self._log_queue_due = time.monotonic() + LOG_QUEUE_INTERVAL_MS / 1000
+        self.root.after(LOG_QUEUE_INTERVAL_MS, self._process_log_queue)
+        self.root.after(200, self._resume_pending_jobs)
 
     def _setup_background(self):
         """Prepare a blurred background image if Pillow and the asset are available."""
@@ -141,6 +1400,32 @@ class SteamManifestDownloader:
         self.background_photo = photo
         self._background_size = (width, height)
 
+    def _sweep_download_root(self):
+        # 遍历所有游戏目录可能很慢，放到后台；任务队列在清扫结束前不会领取任务
+        threading.Thread(
+            target=self._sweep_worker, name="startup-sweep", daemon=True
+        ).start()
+
+    def _sweep_worker(self):
+        try:
+            self._sweep_leftovers()
+        except Exception as exc:  # noqa: BLE001
+            self._enqueue_log(f"清理临时文件失败：{exc}")
+        finally:
+            self._sweep_done.set()
+
+    def _sweep_leftovers(self):
+        download_root = os.path.join(os.getcwd(), "download")
+        removed = sweep_orphaned_artifacts(download_root)
+        for leftover in Path.cwd().glob(f"{TEMP_PREFIX}config-*.part"):
+            try:
+                leftover.unlink()
+                removed.append(str(leftover))
+            except OSError:
+                pass
+        if removed:
+            self._enqueue_log(f"已清理 {len(removed)} 个上次异常退出残留的临时文件。")
+
     def _on_root_configure(self, event):
         if event.widget is not self.root:
             return
@@ -236,6 +1521,12 @@ class SteamManifestDownloader:
             text="打开下载目录",
             command=self.open_download_folder,
         ).pack(side="left")
+        ttk.Button(
+            bottom_frame,
+            text="本地库",
+            command=self.open_library_window,
+            width=8,
+        ).pack(side="left", padx=(5, 0))
         self.settings_btn = ttk.Button(
             bottom_frame,
             text="设置",
@@ -243,13 +1534,19 @@ class SteamManifestDownloader:
             width=10,
         )
         self.settings_btn.pack(side="left", padx=5)
+        ttk.Button(
+            bottom_frame,
+            text="重试失败",
+            command=self.retry_failed_jobs,
+            width=10,
+        ).pack(side="left", padx=(0, 5))
         ttk.Button(
             bottom_frame,
             text="官网",
             command=self.open_official_site,
             width=8,
         ).pack(side="left")
-        ttk.Button(bottom_frame, text="退出", command=self.root.quit).pack(
+        ttk.Button(bottom_frame, text="退出", command=self.shutdown).pack(
             side="right"
         )
 
@@ -309,10 +1606,35 @@ class SteamManifestDownloader:
             foreground="#1a73e8",
         ).pack(side="right")
 
+        network_frame = ttk.LabelFrame(settings_window, text="网络")
+        network_frame.pack(fill="x", padx=15, pady=10)
+        network_row = ttk.Frame(network_frame)
+        network_row.pack(fill="x", padx=10, pady=5)
+        ttk.Label(network_row, text="下载限速 (KiB/s，0 为不限速):").pack(side="left")
+        ttk.Spinbox(
+            network_row,
+            from_=0,
+            to=1024 * 1024,
+            increment=256,
+            width=8,
+            textvariable=self.bandwidth_limit,
+            command=self.apply_bandwidth_limit,
+        ).pack(side="right")
+        settings_window.bind("<Return>", lambda e: self.apply_bandwidth_limit(), add="+")
+
+        debug_frame = ttk.LabelFrame(settings_window, text="诊断")
+        debug_frame.pack(fill="x", padx=15, pady=10)
+        ttk.Checkbutton(
+            debug_frame,
+            text="性能分析模式（结果写入 log 目录）",
+            variable=self.profiling,
+            command=self.toggle_profiling,
+        ).pack(anchor="w", padx=10, pady=5)
+
         ttk.Button(
             settings_window,
             text="关闭",
-            command=settings_window.destroy,
+            command=lambda: (self.apply_bandwidth_limit(), settings_window.destroy()),
         ).pack(pady=10)
 
         settings_window.update_idletasks()
@@ -347,6 +1669,19 @@ class SteamManifestDownloader:
         self.settings["download_source"] = value
         self.save_settings()
 
+    def apply_bandwidth_limit(self):
+        try:
+            limit = max(0, int(self.bandwidth_limit.get()))
+        except (tk.TclError, ValueError):
+            limit = 0
+        self.bandwidth_limit.set(limit)
+        if limit == self.settings.get("bandwidth_limit_kib", 0):
+            return
+        self.scheduler.set_rate_limit(limit * 1024)
+        self.log(f"下载限速已设置为：{limit} KiB/s" if limit else "下载限速已关闭")
+        self.settings["bandwidth_limit_kib"] = limit
+        self.save_settings()
+
     def toggle_auto_import(self):
         state = "已启用" if self.auto_import.get() else "已禁用"
         self.log(f"自动入库功能{state}")
@@ -369,27 +1704,128 @@ class SteamManifestDownloader:
         except OSError as exc:
             self.log(f"无法打开目录：{exc}")
 
+    def open_library_window(self):
+        if self.library_window is not None:
+            self.library_window.window.lift()
+            return
+        self.library_window = LibraryWindow(self)
+
     def start_download(self):
-        appid = self.appid_entry.get().strip()
-        if not appid:
+        # 支持一次输入多个 AppID（空格或逗号分隔），依次排入持久化队列
+        appids = [item for item in re.split(r"[\s,，]+", self.appid_entry.get()) if item]
+        if not appids:
             messagebox.showwarning("提示", "请输入 AppID")
             return
-        if self.current_task and self.current_task.is_alive():
-            messagebox.showinfo("提示", "已有任务在执行，请稍候。")
-            return
 
         source = self.download_source.get()
+        # 单个 AppID 视为交互任务，批量输入按后台同步处理
+        priority = PRIORITY_INTERACTIVE if len(appids) == 1 else PRIORITY_SYNC
+        queued: list[str] = []
+        for appid in appids:
+            try:
+                if self.job_store.enqueue(appid, source, priority):
+                    queued.append(appid)
+                else:
+                    self.log(f"AppID {appid} 正在下载中，已忽略重复请求。")
+            except sqlite3.Error as exc:
+                self.log(f"无法将 AppID {appid} 加入队列：{exc}")
+        if not queued:
+            return
+        if len(appids) == 1:
+            self.log(f"开始执行 {source} 源下载，AppID = {queued[0]}")
+        else:
+            self.log(f"已加入队列 {len(queued)} 个 AppID（{source} 源）")
+        self._ensure_job_worker()
+
+    def retry_failed_jobs(self):
+        try:
+            count = self.job_store.retry_failed()
+        except sqlite3.Error as exc:
+            self.log(f"任务队列数据库出错：{exc}")
+            return
+        if not count:
+            self.log("没有失败的任务需要重试。")
+            return
+        self.log(f"已重新排队 {count} 个失败任务。")
+        self._ensure_job_worker()
+
+    def _resume_pending_jobs(self):
+        try:
+            pending = self.job_store.recover_interrupted()
+        except sqlite3.Error as exc:
+            self.log(f"任务队列数据库出错：{exc}")
+            return
+        if not pending:
+            return
+        if messagebox.askyesno("恢复任务", f"上次有 {pending} 个任务未完成，是否继续？"):
+            self.log(f"继续执行上次未完成的 {pending} 个任务。")
+            self._ensure_job_worker()
+            return
+        try:
+            self.job_store.defer_pending("上次未完成，用户选择暂不恢复")
+        except sqlite3.Error as exc:
+            self.log(f"任务队列数据库出错：{exc}")
+            return
+        self.log(f"已暂缓 {pending} 个未完成任务，可通过“重试失败”继续。")
 
+    def _ensure_job_worker(self):
+        # current_task 只在 _worker_lock 下读写：工人在同一把锁内确认队列为空并退出，
+        # 因此新入队的任务要么被现有工人领取，要么由这里启动新工人
+        with self._worker_lock:
+            if self.current_task is not None:
+                return
+            self.current_task = threading.Thread(
+                target=self._job_worker, name="job-worker", daemon=True
+            )
+            self.current_task.start()
         self.progress_var.set(0)
-        self.log(f"开始执行 {source} 源下载，AppID = {appid}")
-        self.download_btn.configure(state="disabled")
         self._start_progress_animation()
-        self.current_task = threading.Thread(
-            target=self._background_job, args=(source, appid), daemon=True
-        )
-        self.current_task.start()
 
-    def _background_job(self, source: str, appid: str):
+    def _job_worker(self):
+        self._sweep_done.wait()
+        # 自动入库攒批执行：队列清空或攒满 IMPORT_BATCH_SIZE 个时统一拷贝一次
+        pending_imports: dict[str, str] = {}
+        while True:
+            with self._worker_lock:
+                try:
+                    job = self.job_store.claim_next()
+                except sqlite3.Error as exc:
+                    self._enqueue_log(f"任务队列数据库出错，队列已暂停：{exc}")
+                    job = None
+                if job is None:
+                    self.current_task = None
+                    break
+            appid, source, priority = job
+            self._job_local.last_error = None
+            self._job_local.last_message = None
+            self._job_local.download_dir = None
+            try:
+                success = self._background_job(source, appid, priority)
+            except Exception as exc:  # noqa: BLE001
+                self._enqueue_log(f"任务执行异常：{exc}")
+                self._job_local.last_error = str(exc)
+                success = False
+            try:
+                self.job_store.finish(appid, success, self._job_local.last_error)
+            except sqlite3.Error as exc:
+                self._enqueue_log(f"无法记录任务 {appid} 的结果：{exc}")
+            if success and self._job_local.download_dir and self.auto_import.get():
+                pending_imports[appid] = self._job_local.download_dir
+                if len(pending_imports) >= IMPORT_BATCH_SIZE:
+                    self._flush_imports(pending_imports)
+        self._flush_imports(pending_imports)
+        self.root.after(0, self._on_task_finished)
+
+    def _flush_imports(self, pending_imports: dict[str, str]) -> None:
+        if not pending_imports:
+            return
+        self._enqueue_log(f"开始自动入库 {len(pending_imports)} 个 AppID...")
+        self._import_lua_batch(list(pending_imports), pending_imports)
+        pending_imports.clear()
+
+    def _background_job(
+        self, source: str, appid: str, priority: int = PRIORITY_INTERACTIVE
+    ) -> bool:
         name, header_url, image_data, folder_name = self._collect_game_info(appid)
         self.root.after(
             0,
@@ -397,54 +1833,82 @@ class SteamManifestDownloader:
                 name, header_url, image_data, folder_name
             ),
         )
-        self._run_download_flow(source, appid, folder_name)
+        return self._run_download_flow(source, appid, folder_name, priority)
 
-    def _run_download_flow(self, source: str, appid: str, folder_name: str):
+    def _run_download_flow(
+        self,
+        source: str,
+        appid: str,
+        folder_name: str,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> bool:
         folder_name = folder_name or appid
         download_root = os.path.join(os.getcwd(), "download")
         os.makedirs(download_root, exist_ok=True)
         try:
-            if source == "domestic":
-                success = self._handle_domestic_download(appid, folder_name, download_root)
-            else:
-                success = self._handle_overseas_download(appid, folder_name, download_root)
+            with AppIdLock(download_root, appid):
+                if source == "domestic":
+                    success = self._handle_domestic_download(
+                        appid, folder_name, download_root, priority
+                    )
+                else:
+                    success = self._handle_overseas_download(
+                        appid, folder_name, download_root, priority
+                    )
+        except RuntimeError as exc:
+            self._enqueue_log(str(exc))
+            success = False
         except Exception as exc:  # noqa: BLE001
             self._enqueue_log(f"下载过程中出现异常：{exc}")
             success = False
 
-        if success and self.auto_import.get():
-            self._enqueue_log("下载完成，开始自动入库...")
-            if self._auto_import_lua(appid):
-                self._enqueue_log("自动入库完成。")
+        self._job_local.download_dir = (
+            os.path.join(download_root, folder_name) if success else None
+        )
         if success:
             self._enqueue_log("任务完成。")
         else:
+            self._job_local.last_error = getattr(self._job_local, "last_message", None)
             self._enqueue_log("任务失败，请查看日志。")
 
-        self.root.after(0, self._on_task_finished)
+        self.scheduler.finish_job(appid)
+        return success
 
-    def _handle_domestic_download(self, appid: str, folder_name: str, download_root: str) -> bool:
+    def _handle_domestic_download(
+        self,
+        appid: str,
+        folder_name: str,
+        download_root: str,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> bool:
         base_url = (
             "https://proxy.pipers.cn/https://github.com/SteamAutoCracks/ManifestHub"
             f"/archive/refs/heads/{appid}.zip"
         )
-        zip_path = os.path.join(download_root, f"{appid}.zip")
-        if not self._check_domestic_url(base_url):
+        if not self._check_domestic_url(base_url, appid, priority):
             return False
         self._enqueue_log("国内源连接正常，开始下载文件...")
-        if not self._download_file_stream(base_url, zip_path):
-            return False
-        target_dir = os.path.join(download_root, folder_name)
-        return self._extract_and_cleanup(zip_path, target_dir)
+        with SpillBuffer(download_root, artifact_tag(appid)) as buffer:
+            if not self._download_file_stream(
+                base_url, buffer, priority=priority, job=appid
+            ):
+                return False
+            target_dir = os.path.join(download_root, folder_name)
+            return self._extract_and_cleanup(buffer, target_dir)
 
-    def _handle_overseas_download(self, appid: str, folder_name: str, download_root: str) -> bool:
-        node = self._find_first_valid_node(appid)
+    def _handle_overseas_download(
+        self,
+        appid: str,
+        folder_name: str,
+        download_root: str,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> bool:
+        node = self._find_first_valid_node(appid, priority=priority)
         if node is None:
             self._enqueue_log("没有可用的国外节点，请稍后再试。")
             return False
         self._enqueue_log(f"使用节点 {node} 下载")
         download_url = self._get_overseas_download_url(appid, node)
-        zip_path = os.path.join(download_root, f"{appid}_src{node}.zip")
         headers = {
             "Host": "api-psi-eight-12.vercel.app",
             "Sec-Ch-Ua": '"Chromium";v="141", "Not?A_Brand";v="8"',
@@ -468,64 +1932,67 @@ class SteamManifestDownloader:
             "Accept-Encoding": "gzip, deflate, br",
             "Priority": "u=0, i",
         }
-        if not self._download_file_stream(download_url, zip_path, headers=headers, timeout=(5, 30)):
-            return False
-        target_dir = os.path.join(download_root, folder_name)
-        return self._extract_and_cleanup(zip_path, target_dir)
+        with SpillBuffer(download_root, artifact_tag(appid)) as buffer:
+            if not self._download_file_stream(
+                download_url,
+                buffer,
+                headers=headers,
+                timeout=(5, 30),
+                priority=priority,
+                job=appid,
+            ):
+                return False
+            target_dir = os.path.join(download_root, folder_name)
+            return self._extract_and_cleanup(buffer, target_dir)
 
-    def _extract_and_cleanup(self, zip_path: str, target_dir: str) -> bool:
+    def _extract_and_cleanup(self, buffer: SpillBuffer, target_dir: str) -> bool:
         try:
-            self._process_downloaded_archive(zip_path, target_dir)
+            self._process_downloaded_archive(buffer.reader(), target_dir, buffer.tag)
         except RuntimeError as exc:
             self._enqueue_log(str(exc))
             return False
         finally:
-            if os.path.exists(zip_path):
-                try:
-                    os.remove(zip_path)
-                    self._enqueue_log(f"清理临时压缩包：{zip_path}")
-                except OSError as exc:
-                    self._enqueue_log(f"无法删除压缩包 {zip_path}: {exc}")
+            if buffer.spill_path is not None:
+                self._enqueue_log(f"清理临时压缩包：{buffer.spill_path}")
+            buffer.close()
         return True
 
-    def _process_downloaded_archive(self, zip_path: str, target_dir: str) -> None:
-        archive_path = Path(zip_path)
+    def _process_downloaded_archive(self, archive_source, target_dir: str, tag: str) -> None:
+        # 直接把需要保留的成员写到最终位置，省去暂存目录的解压、移动与删除
         target_root = Path(target_dir)
-        staging_dir = target_root.with_name(target_root.name + "_staging")
-
-        if staging_dir.exists():
-            shutil.rmtree(staging_dir)
         target_root.mkdir(parents=True, exist_ok=True)
-        staging_dir.mkdir(parents=True, exist_ok=True)
-
         try:
-            with zipfile.ZipFile(archive_path, "r") as archive:
-                archive.extractall(staging_dir)
+            with zipfile.ZipFile(archive_source, "r") as archive:
+                for member in archive.infolist():
+                    if member.is_dir():
+                        continue
+                    name = Path(member.filename).name
+                    if Path(name).suffix.lower() not in ALLOWED_SUFFIXES:
+                        continue
+                    dest = target_root / name
+                    try:
+                        with archive.open(member) as src, atomic_output(
+                            str(dest), tag
+                        ) as dst:
+                            shutil.copyfileobj(src, dst, DOWNLOAD_CHUNK_SIZE)
+                    except OSError as exc:
+                        self._enqueue_log(f"写入 {dest} 失败: {exc}")
         except zipfile.BadZipFile as exc:
-            shutil.rmtree(staging_dir, ignore_errors=True)
-            raise RuntimeError(f"{archive_path} 不是有效的压缩包: {exc}") from exc
-
-        for file_path in staging_dir.rglob("*"):
-            if not file_path.is_file():
-                continue
-            if file_path.suffix.lower() not in ALLOWED_SUFFIXES:
-                continue
-            dest = target_root / file_path.name
-            try:
-                shutil.move(str(file_path), str(dest))
-            except Exception as exc:  # noqa: BLE001
-                self._enqueue_log(f"移动 {file_path} -> {dest} 失败: {exc}")
-
-        shutil.rmtree(staging_dir, ignore_errors=True)
+            raise RuntimeError(f"下载内容不是有效的压缩包: {exc}") from exc
         self._enqueue_log(f"解压完成，保留的文件已保存至 {target_root}")
 
-    def _check_domestic_url(self, url: str) -> bool:
+    def _check_domestic_url(
+        self, url: str, appid: str, priority: int = PRIORITY_INTERACTIVE
+    ) -> bool:
         try:
-            response = requests.get(url, timeout=10)
-            if response.status_code == 404:
+            # 只看状态码，不下载压缩包正文
+            status = self.scheduler.probe(url, priority, appid, timeout=10)
+            if status == 404:
                 self._enqueue_log("国内源未收录该游戏的资源，请尝试切换到国外源。")
                 return False
-            response.raise_for_status()
+            if status >= 400:
+                self._enqueue_log(f"国内源连接失败：HTTP {status}")
+                return False
             return True
         except requests.RequestException as exc:
             self._enqueue_log(f"国内源连接失败：{exc}")
@@ -534,28 +2001,50 @@ class SteamManifestDownloader:
     def _download_file_stream(
         self,
         url: str,
-        save_path: str,
+        buffer: SpillBuffer,
         headers: dict | None = None,
         timeout: float | tuple[float, float] = 30,
+        priority: int = PRIORITY_INTERACTIVE,
+        job: str | None = None,
     ) -> bool:
         self._enqueue_log(f"开始下载...")
         try:
-            with requests.get(url, headers=headers, stream=True, timeout=timeout) as resp:
+            with self.scheduler.slot(url, priority, job), requests.get(
+                url, headers=headers, stream=True, timeout=timeout
+            ) as resp:
                 resp.raise_for_status()
-                with open(save_path, "wb") as file_handle:
-                    for chunk in resp.iter_content(chunk_size=8192):
-                        if chunk:
-                            file_handle.write(chunk)
-            self._enqueue_log(f"下载完成：{save_path}")
+                content_length = resp.headers.get("Content-Length", "")
+                if content_length.isdigit():
+                    buffer.expect(int(content_length))
+                next_record = PROGRESS_RECORD_INTERVAL
+                for chunk in self.scheduler.iter_content(resp):
+                    buffer.write(chunk)
+                    if job is not None and buffer.size >= next_record:
+                        self.job_store.record_progress(job, buffer.size)
+                        next_record += PROGRESS_RECORD_INTERVAL
+            where = "内存" if buffer.in_memory else buffer.spill_path
+            self._enqueue_log(f"下载完成：{buffer.size} 字节（{where}）")
             return True
         except requests.RequestException as exc:
+            if job is not None and buffer.size:
+                self.job_store.record_progress(job, buffer.size)
             self._enqueue_log(f"下载失败：{exc}")
             return False
+        except OSError as exc:
+            self._enqueue_log(f"写入文件失败：{exc}")
+            return False
 
-    def _find_first_valid_node(self, appid: str, total_nodes: int = 6) -> int | None:
-        with ThreadPoolExecutor(max_workers=total_nodes) as executor:
+    def _find_first_valid_node(
+        self,
+        appid: str,
+        total_nodes: int = OVERSEAS_NODE_COUNT,
+        priority: int = PRIORITY_INTERACTIVE,
+    ) -> int | None:
+        with ThreadPoolExecutor(
+            max_workers=total_nodes, thread_name_prefix="node-probe"
+        ) as executor:
             future_map = {
-                executor.submit(self._check_overseas_node, appid, node): node
+                executor.submit(self._check_overseas_node, appid, node, priority): node
                 for node in range(total_nodes)
             }
             for future in as_completed(future_map):
@@ -564,52 +2053,116 @@ class SteamManifestDownloader:
                     return node
         return None
 
-    def _check_overseas_node(self, appid: str, node: int) -> bool:
+    def _check_overseas_node(
+        self, appid: str, node: int, priority: int = PRIORITY_INTERACTIVE
+    ) -> bool:
         url = self._get_overseas_download_url(appid, node)
         try:
-            response = requests.get(url, timeout=NODE_TIMEOUT)
-            return response.status_code == 200
+            return self.scheduler.probe(url, priority, appid, timeout=NODE_TIMEOUT) == 200
         except requests.RequestException:
             return False
 
     def _get_overseas_download_url(self, appid: str, node: int) -> str:
-        base32_id = self._base32_encode(appid)
-        return f"https://api-psi-eight-12.vercel.app/download?id={base32_id}&src={node}"
-
-    def _auto_import_lua(self, appid: str) -> bool:
+        return overseas_download_url(appid, node)
+
+    def _import_lua_batch(
+        self, appids: Iterable[str], folders: dict[str, str] | None = None
+    ) -> dict[str, int]:
+        """Copy the .lua files of many AppIDs into stplug-in in one pass, skipping unchanged ones.
+
+        ``folders`` maps AppIDs to the game folder they were extracted into, so known
+        files are found without searching ``download/``.
+        """
+        summary = {"copied": 0, "skipped": 0, "failed": 0}
+        appids = list(dict.fromkeys(appids))
         try:
-            self._copy_lua_to_steam(appid)
-            return True
-        except (FileNotFoundError, RuntimeError) as exc:
+            target_dir = self._get_steam_root() / "config" / "stplug-in"
+            target_dir.mkdir(parents=True, exist_ok=True)
+        except (OSError, RuntimeError) as exc:
+            self._invalidate_steam_root()
             self._enqueue_log(str(exc))
-        except Exception as exc:  # noqa: BLE001
-            self._enqueue_log(f"自动入库失败：{exc}")
-        return False
+            summary["failed"] = len(appids)
+            return summary
+
+        lua_index = self._index_lua_files(appids, folders or {})
+        for appid in appids:
+            lua_file = lua_index.get(f"{appid}.lua")
+            if lua_file is None:
+                self._enqueue_log(
+                    f"未找到 {appid}.lua，请确认文件位于 download 目录或当前目录下。"
+                )
+                summary["failed"] += 1
+                continue
+            destination = target_dir / lua_file.name
+            try:
+                if self._is_same_file_content(lua_file, destination):
+                    summary["skipped"] += 1
+                    continue
+                shutil.copy2(lua_file, destination)
+            except OSError as exc:
+                self._enqueue_log(f"自动入库失败：{exc}")
+                summary["failed"] += 1
+                if not target_dir.is_dir():
+                    self._invalidate_steam_root()
+                continue
+            summary["copied"] += 1
+            self._enqueue_log(f"已将 {lua_file} 拷贝到 {destination}")
 
-    def _copy_lua_to_steam(self, appid: str) -> None:
-        lua_file = self._find_lua_file(appid)
-        steam_root = self._resolve_steam_root()
-        target_dir = steam_root / "config" / "stplug-in"
-        target_dir.mkdir(parents=True, exist_ok=True)
-        destination = target_dir / lua_file.name
-        shutil.copy2(lua_file, destination)
-        self._enqueue_log(f"已将 {lua_file} 拷贝到 {destination}")
-
-    def _find_lua_file(self, appid: str) -> Path:
-        file_name = f"{appid}.lua"
-        search_paths = [
-            Path.cwd() / "download" / file_name,
-            Path.cwd() / file_name,
-        ]
-        for path in search_paths:
-            if path.is_file():
-                return path
+        self._enqueue_log(
+            f"入库汇总：复制 {summary['copied']}，未变化跳过 {summary['skipped']}，"
+            f"失败 {summary['failed']}"
+        )
+        return summary
+
+    @staticmethod
+    def _is_same_file_content(source: Path, destination: Path) -> bool:
+        try:
+            dst_stat = destination.stat()
+        except FileNotFoundError:
+            return False
+        src_stat = source.stat()
+        if src_stat.st_size != dst_stat.st_size:
+            return False
+        if int(src_stat.st_mtime) == int(dst_stat.st_mtime):
+            return True
+        return _file_digest(source) == _file_digest(destination)
+
+    def _index_lua_files(
+        self, appids: Iterable[str], folders: dict[str, str]
+    ) -> dict[str, Path]:
+        pending: set[str] = set()
+        found: dict[str, Path] = {}
+        for appid in appids:
+            name = f"{appid}.lua"
+            candidates = [Path.cwd() / "download" / name, Path.cwd() / name]
+            if appid in folders:
+                candidates.insert(0, Path(folders[appid]) / name)
+            match = next((path for path in candidates if path.is_file()), None)
+            if match is None:
+                pending.add(name)
+            else:
+                found[name] = match
         download_root = Path.cwd() / "download"
-        if download_root.exists():
-            for match in download_root.rglob(file_name):
-                if match.is_file():
-                    return match
-        raise FileNotFoundError(f"未找到 {file_name}，请确认文件位于 download 目录或当前目录下。")
+        if pending and download_root.exists():
+            for match in download_root.rglob("*.lua"):
+                if match.name in pending and match.is_file():
+                    found[match.name] = match
+                    pending.discard(match.name)
+                    if not pending:
+                        break
+        return found
+
+    def _get_steam_root(self) -> Path:
+        """Return the Steam root resolved once per session, re-resolving if it disappeared."""
+        with self._steam_root_lock:
+            if self._steam_root is not None and self._steam_root.is_dir():
+                return self._steam_root
+            self._steam_root = self._resolve_steam_root()
+            return self._steam_root
+
+    def _invalidate_steam_root(self) -> None:
+        with self._steam_root_lock:
+            self._steam_root = None
 
     def _resolve_steam_root(self) -> Path:
         for key in STEAM_ENV_KEYS:
@@ -646,16 +2199,56 @@ class SteamManifestDownloader:
         return None
 
     def _enqueue_log(self, message: str):
+        self._job_local.last_message = message
         self.log_queue.put(message)
 
     def _process_log_queue(self):
+        if self.profiler is not None:
+            self.profiler.record_loop_lag(max(0.0, time.monotonic() - self._log_queue_due))
         while not self.log_queue.empty():
             try:
                 message = self.log_queue.get_nowait()
             except queue.Empty:
                 break
             self.log(message)
-        self.root.after(100, self._process_log_queue)
+        self._log_queue_due = time.monotonic() + LOG_QUEUE_INTERVAL_MS / 1000
+        self.root.after(LOG_QUEUE_INTERVAL_MS, self._process_log_queue)
+
+    def _start_profiler(self):
+        if self.profiler is not None:
+            return
+        self.profiler = SamplingProfiler(self.log_dir)
+        for name in PROFILED_METHODS:
+            setattr(self, name, self.profiler.wrap(name, getattr(type(self), name).__get__(self)))
+        self.profiler.start()
+        self.log(f"性能分析已开启，结果将写入 {self.profiler.summary_path}")
+
+    def _stop_profiler(self):
+        if self.profiler is None:
+            return
+        profiler, self.profiler = self.profiler, None
+        for name in PROFILED_METHODS:
+            self.__dict__.pop(name, None)
+        profiler.stop()
+        self.log(f"性能分析已关闭，结果已写入 {profiler.summary_path}")
+
+    def toggle_profiling(self):
+        if self.profiling.get():
+            self._start_profiler()
+        else:
+            self._stop_profiler()
+        self.settings["profiling"] = self.profiling.get()
+        self.save_settings()
+
+    def teardown(self):
+        """Stop background diagnostics and flush their output; safe to call more than once."""
+        if self.profiler is not None:
+            profiler, self.profiler = self.profiler, None
+            profiler.stop()
+
+    def shutdown(self):
+        self.teardown()
+        self.root.quit()
 
     def _write_log_file(self, message: str):
         try:
@@ -706,7 +2299,9 @@ class SteamManifestDownloader:
         url = "https://store.steampowered.com/api/appdetails"
         params = {"appids": appid, "cc": "CN", "l": "schinese"}
         try:
-            resp = requests.get(url, params=params, timeout=5)
+            resp = self.scheduler.get(
+                url, PRIORITY_METADATA, appid, params=params, timeout=5
+            )
             resp.raise_for_status()
         except requests.RequestException as exc:
             self.log(f"获取游戏信息失败：{exc}")
@@ -722,9 +2317,9 @@ class SteamManifestDownloader:
         if BeautifulSoup is None:
             return None, None
         base32_id = self._base32_encode(appid)
-        url = f"https://api-psi-eight-12.vercel.app/proxy?id={base32_id}"
+        url = f"{OVERSEAS_API_BASE}/proxy?id={base32_id}"
         try:
-            resp = requests.get(url, timeout=8)
+            resp = self.scheduler.get(url, PRIORITY_METADATA, appid, timeout=8)
             resp.raise_for_status()
         except requests.RequestException as exc:
             self.log(f"获取代理页面失败：{exc}")
@@ -752,21 +2347,15 @@ class SteamManifestDownloader:
 
     @staticmethod
     def _base32_encode(input_str: str) -> str:
-        alphabet = "ABCDEFGHIJKLMNOPQRSTUVWXYZ234567"
-        bits = "".join(bin(ord(c))[2:].zfill(8) for c in input_str)
-        result = []
-        for i in range(0, len(bits), 5):
-            chunk = bits[i : i + 5].ljust(5, "0")
-            result.append(alphabet[int(chunk, 2)])
-        return "".join(result)
+        return base32_encode(input_str)
 
     def _download_image_bytes(self, url: str | None) -> bytes | None:
         if not url:
             return None
         try:
-            resp = requests.get(url, timeout=5)
-            resp.raise_for_status()
-            return resp.content
+            return self.scheduler.get_limited(
+                url, MAX_IMAGE_BYTES, PRIORITY_METADATA, timeout=5
+            )
         except requests.RequestException:
             return None
 
@@ -780,10 +2369,10 @@ class SteamManifestDownloader:
         max_height = self.game_image.winfo_height() or 180
 
         if image_data is None:
-            image_data = self._download_image_bytes(header_url)
-            if image_data is None:
-                self.game_image.configure(text=f"图片：{header_url}", image="")
-                return
+            # 图片已在后台线程获取；取不到（或超过 MAX_IMAGE_BYTES）时只显示链接，不在 Tk 线程联网
+            self.game_image.configure(text=f"图片：{header_url}", image="")
+            self.game_image_photo = None
+            return
 
         if Image is not None and ImageTk is not None:
             try:
@@ -826,6 +2415,8 @@ class SteamManifestDownloader:
         self.progress_var.set(100)
 
     def _on_task_finished(self):
+        if self.current_task is not None:
+            return
         self._stop_progress_animation()
         self.download_btn.configure(state="normal")
 
@@ -836,18 +2427,31 @@ class SteamManifestDownloader:
                     return json.load(f)
             except (json.JSONDecodeError, OSError):
                 pass
-        return {"download_source": "domestic", "auto_import": False}
+        return {"download_source": "domestic", "auto_import": False, "bandwidth_limit_kib": 0}
 
     def save_settings(self):
-        data = {
-            "download_source": self.download_source.get(),
-            "auto_import": self.auto_import.get(),
-        }
-        with open("config.json", "w", encoding="utf-8") as f:
-            json.dump(data, f, indent=4)
+        data = dict(self.settings)
+        data.update(
+            download_source=self.download_source.get(),
+            auto_import=self.auto_import.get(),
+        )
+        payload = json.dumps(data, indent=4).encode("utf-8")
+        try:
+            with atomic_output("config.json", "config") as f:
+                f.write(payload)
+        except OSError as exc:
+            self.log(f"保存设置失败：{exc}")
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Steam Manifest 下载器 & 自动入库工具")
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="开启性能分析模式，采样结果写入 log 目录",
+    )
+    args = parser.parse_args()
     root = tk.Tk()
-    app = SteamManifestDownloader(root)
+    app = SteamManifestDownloader(root, profile=args.profile)
     root.mainloop()
+    app.teardown()
@@ -0,0 +1,18 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+
+@pytest.fixture(scope="session")
+def stm():
+    """The application module; skipped when its runtime dependencies are missing."""
+    for name in ("requests", "bs4", "tkinter"):
+        pytest.importorskip(name)
+    import steamtoolsmanager
+
+    return steamtoolsmanager
@@ -0,0 +1,59 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+
+def test_sweep_skips_folders_that_vanish(stm, tmp_path, monkeypatch):
+    (tmp_path / "Gone").mkdir()
+    (tmp_path / "Game").mkdir()
+    orphan = tmp_path / "Game" / ".tmp-730-abc.part"
+    orphan.write_bytes(b"x")
+    real_scandir = os.scandir
+
+    def flaky_scandir(path="."):
+        if os.path.basename(path) == "Gone":
+            raise FileNotFoundError(path)
+        return real_scandir(path)
+
+    monkeypatch.setattr(stm.os, "scandir", flaky_scandir)
+    assert stm.sweep_orphaned_artifacts(str(tmp_path)) == [str(orphan)]
+
+
+def test_sweep_keeps_artifacts_of_locked_appid(stm, tmp_path):
+    leftover = tmp_path / ".tmp-730-abc.part"
+    leftover.write_bytes(b"x")
+    with stm.AppIdLock(str(tmp_path), "730"):
+        assert stm.sweep_orphaned_artifacts(str(tmp_path)) == []
+    assert stm.sweep_orphaned_artifacts(str(tmp_path)) == [str(leftover)]
+
+
+def test_lock_released_when_holder_crashes(stm, tmp_path):
+    script = textwrap.dedent(
+        f"""
+        import os, sys
+        sys.path.insert(0, {os.path.dirname(stm.__file__)!r})
+        import steamtoolsmanager as stm
+        assert stm.AppIdLock({str(tmp_path)!r}, "730").acquire()
+        os._exit(1)
+        """
+    )
+    subprocess.run([sys.executable, "-c", script], check=False)
+    lock = stm.AppIdLock(str(tmp_path), "730")
+    assert lock.acquire()
+    lock.release()
+
+
+def test_lua_lookup_prefers_known_folder(stm, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    game = tmp_path / "download" / "Half-Life"
+    game.mkdir(parents=True)
+    (game / "70.lua").write_text("-- 70")
+    app = stm.SteamManifestDownloader.__new__(stm.SteamManifestDownloader)
+
+    def no_rglob(self, pattern):
+        raise AssertionError("known folders must not trigger a full scan")
+
+    monkeypatch.setattr(stm.Path, "rglob", no_rglob)
+    found = app._index_lua_files(["70"], {"70": str(game)})
+    assert found == {"70.lua": game / "70.lua"}
@@ -0,0 +1,63 @@
+import random
+import timeit
+
+import pytest
+
+
+def _random_string(rng: random.Random) -> str:
+    length = rng.randint(0, 16)
+    chars = []
+    for _ in range(length):
+        roll = rng.random()
+        if roll < 0.6:
+            chars.append(chr(rng.randint(0x30, 0x39)))
+        elif roll < 0.85:
+            chars.append(chr(rng.randint(0, 0xFF)))
+        else:
+            code = rng.randint(0x100, 0x10FFFF)
+            if 0xD800 <= code <= 0xDFFF:
+                code = 0x4E2D
+            chars.append(chr(code))
+    return "".join(chars)
+
+
+@pytest.mark.parametrize(
+    "value",
+    ["", "0", "730", "2357570", "ÿ", "\x00", "中文", "€", "😀", "730中"],
+)
+def test_base32_encode_matches_legacy_examples(stm, value):
+    assert stm.base32_encode.__wrapped__(value) == stm._base32_encode_legacy(value)
+    assert stm.base32_encode(value) == stm._base32_encode_legacy(value)
+
+
+def test_base32_encode_matches_legacy_random(stm):
+    rng = random.Random(20261019)
+    for _ in range(20000):
+        value = _random_string(rng)
+        assert stm.base32_encode.__wrapped__(value) == stm._base32_encode_legacy(value), value
+
+
+def test_overseas_download_url_uses_encoded_appid(stm):
+    assert stm.overseas_download_url("730", 3) == (
+        f"{stm.OVERSEAS_API_BASE}/download?id={stm._base32_encode_legacy('730')}&src=3"
+    )
+
+
+def test_base32_encode_benchmark(stm):
+    rng = random.Random(7)
+    appids = [str(rng.randint(10, 3_000_000)) for _ in range(5000)]
+    fast = stm.base32_encode.__wrapped__
+    legacy = stm._base32_encode_legacy
+
+    legacy_time = min(timeit.repeat(lambda: [legacy(a) for a in appids], number=3, repeat=3))
+    fast_time = min(timeit.repeat(lambda: [fast(a) for a in appids], number=3, repeat=3))
+    stm.base32_encode.cache_clear()
+    cached_time = min(
+        timeit.repeat(lambda: [stm.base32_encode(a) for a in appids], number=3, repeat=3)
+    )
+    print(
+        f"\nbase32 x{len(appids) * 3}: legacy {legacy_time * 1000:.1f}ms, "
+        f"codec {fast_time * 1000:.1f}ms, memoized {cached_time * 1000:.1f}ms"
+    )
+    assert fast_time < legacy_time
+    assert cached_time < legacy_time
@@ -0,0 +1,7 @@
+def test_enqueue_reports_running_appid(stm, tmp_path):
+    store = stm.JobStore(tmp_path / "jobs.sqlite3")
+    assert store.enqueue("730", "domestic")
+    assert store.claim_next() == ("730", "domestic", stm.PRIORITY_INTERACTIVE)
+    assert not store.enqueue("730", "domestic")
+    store.finish("730", True, None)
+    assert store.enqueue("730", "domestic")
@@ -0,0 +1,45 @@
+import os
+
+
+class FakeApp:
+    def __init__(self, root):
+        self.root = root
+        self.lookups = 0
+
+    def _get_steam_root(self):
+        self.lookups += 1
+        if self.root is None:
+            raise RuntimeError("Steam not found")
+        return self.root
+
+
+def _window(stm, app):
+    window = stm.LibraryWindow.__new__(stm.LibraryWindow)
+    window.app = app
+    window._plugin_dir = None
+    window._plugin_mtime = None
+    window._steam_missing = False
+    return window
+
+
+def test_imported_appids_skips_unchanged_plugin_dir(stm, tmp_path):
+    plugin_dir = tmp_path / "config" / "stplug-in"
+    plugin_dir.mkdir(parents=True)
+    (plugin_dir / "730.lua").write_text("")
+    window = _window(stm, FakeApp(tmp_path))
+    assert window._imported_appids() == {"730"}
+    assert window._imported_appids() is None
+    (plugin_dir / "570.lua").write_text("")
+    os.utime(plugin_dir, ns=(0, 1))
+    assert window._imported_appids() == {"730", "570"}
+    assert window.app.lookups == 1
+
+
+def test_missing_steam_is_remembered_until_forced(stm):
+    app = FakeApp(None)
+    window = _window(stm, app)
+    assert window._imported_appids() == set()
+    assert window._imported_appids() is None
+    assert app.lookups == 1
+    window._imported_appids(force=True)
+    assert app.lookups == 2
@@ -0,0 +1,148 @@
+import io
+import os
+import queue
+import threading
+import tracemalloc
+import zipfile
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+MIB = 1024 * 1024
+SPILL_LIMIT = 1 * MIB
+SHARED_BUDGET = 2 * MIB
+ARCHIVE_SIZES = (512 * 1024, 2 * MIB, 8 * MIB, 24 * MIB)
+# 低于单任务上限、且不带 Content-Length 的归档，只有共享预算能迫使其落盘
+IN_MEMORY_SIZE = 768 * 1024
+JOB_COUNTS = (1, 4, 8)
+# 请求库、zipfile 与每个线程的固定块缓冲带来的额外开销上限
+PER_JOB_SLACK = 768 * 1024
+PER_JOB_BUFFERS = 160 * 1024
+BASE_SLACK = 2 * MIB
+
+
+def _build_archive(size: int) -> bytes:
+    raw = io.BytesIO()
+    with zipfile.ZipFile(raw, "w", zipfile.ZIP_STORED) as archive:
+        archive.writestr("repo-main/730.lua", b"addappid(730)\n")
+        archive.writestr("repo-main/731_1.manifest", os.urandom(size // 2))
+        archive.writestr("repo-main/readme.txt", os.urandom(size // 2))
+    return raw.getvalue()
+
+
+@pytest.fixture(scope="module")
+def archive_server():
+    archives = {f"/{size}.zip": _build_archive(size) for size in ARCHIVE_SIZES + (IN_MEMORY_SIZE,)}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            path, _, query = self.path.partition("?")
+            body = archives.get(path)
+            if body is None:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/zip")
+            if query != "nolength":
+                self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            view = memoryview(body)
+            for start in range(0, len(view), 256 * 1024):
+                self.wfile.write(view[start : start + 256 * 1024])
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def engine(stm, tmp_path):
+    """A downloader instance with only the engine state, no Tk window."""
+    app = stm.SteamManifestDownloader.__new__(stm.SteamManifestDownloader)
+    app.scheduler = stm.NetworkScheduler(default_host_limit=16)
+    app.job_store = stm.JobStore(tmp_path / "jobs.sqlite3")
+    app.log_queue = queue.Queue()
+    app._job_local = threading.local()
+    return app
+
+
+def _run_job(stm, app, url: str, workdir, tag: str, budget) -> None:
+    with stm.SpillBuffer(str(workdir), tag, limit=SPILL_LIMIT, budget=budget) as buffer:
+        assert app._download_file_stream(url, buffer, job=tag)
+        assert app._extract_and_cleanup(buffer, str(workdir / tag))
+    kept = sorted(os.listdir(workdir / tag))
+    assert kept == ["730.lua", "731_1.manifest"]
+
+
+def _peak_during(func) -> int:
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak - baseline
+
+
+def test_peak_memory_flat_as_archive_grows(stm, engine, archive_server, tmp_path):
+    peaks = {}
+    for size in ARCHIVE_SIZES:
+        budget = stm.MemoryBudget(SHARED_BUDGET)
+        peaks[size] = _peak_during(
+            lambda: _run_job(
+                stm, engine, f"{archive_server}/{size}.zip", tmp_path, f"a{size}", budget
+            )
+        )
+        assert budget.used == 0
+    print("\npeak by archive size:", {s // MIB: p // 1024 for s, p in peaks.items()}, "KiB")
+    for size, peak in peaks.items():
+        assert peak < SPILL_LIMIT + PER_JOB_SLACK + BASE_SLACK, (size, peak)
+    # 超过单任务上限之后，峰值不再随归档大小增长
+    spilled = [peaks[size] for size in ARCHIVE_SIZES if size > SPILL_LIMIT]
+    assert max(spilled) < min(spilled) + PER_JOB_SLACK
+
+
+def test_peak_memory_bounded_by_shared_budget(stm, engine, archive_server, tmp_path):
+    url = f"{archive_server}/{IN_MEMORY_SIZE}.zip?nolength"
+    peaks = {}
+    for jobs in JOB_COUNTS:
+        budget = stm.MemoryBudget(SHARED_BUDGET)
+
+        def run_all():
+            errors = []
+
+            def worker(index):
+                try:
+                    _run_job(
+                        stm,
+                        engine,
+                        url,
+                        tmp_path,
+                        f"j{jobs}_{index}",
+                        budget,
+                    )
+                except BaseException as exc:  # noqa: BLE001
+                    errors.append(exc)
+
+            threads = [threading.Thread(target=worker, args=(i,)) for i in range(jobs)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            assert not errors, errors
+
+        peaks[jobs] = _peak_during(run_all)
+        assert budget.used == 0
+    print("\npeak by job count:", {j: p // 1024 for j, p in peaks.items()}, "KiB")
+    for jobs, peak in peaks.items():
+        # 内存中的归档总量受共享预算约束，其余只随任务数线性增长固定的块缓冲；
+        # 没有预算时 8 个任务会同时持有 8 x 768 KiB
+        assert peak < SHARED_BUDGET + jobs * PER_JOB_BUFFERS + MIB, (jobs, peak)
@@ -0,0 +1,59 @@
+import threading
+import time
+
+URL = "https://example.invalid/file"
+
+
+def _wait_for_waiters(scheduler, count):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        with scheduler._cond:
+            if len(scheduler._waiting["example.invalid"]) >= count:
+                return
+        time.sleep(0.005)
+    raise AssertionError(f"expected {count} waiters")
+
+
+def test_slot_round_robins_jobs_within_a_priority(stm):
+    scheduler = stm.NetworkScheduler(host_limits={"example.invalid": 1})
+    order = []
+
+    def request(job):
+        with scheduler.slot(URL, stm.PRIORITY_SYNC, job):
+            order.append(job)
+
+    threads = []
+    with scheduler.slot(URL, stm.PRIORITY_SYNC, "busy"):
+        for index, job in enumerate(["s", "s", "s", "t", "t"], start=1):
+            thread = threading.Thread(target=request, args=(job,))
+            thread.start()
+            threads.append(thread)
+            _wait_for_waiters(scheduler, index)
+    for thread in threads:
+        thread.join(5)
+    assert order == ["s", "t", "s", "t", "s"]
+
+
+def test_slot_serves_higher_priority_first(stm):
+    scheduler = stm.NetworkScheduler(host_limits={"example.invalid": 1})
+    order = []
+
+    def request(job, priority):
+        with scheduler.slot(URL, priority, job):
+            order.append(job)
+
+    threads = []
+    waiting = [
+        ("sync", stm.PRIORITY_SYNC),
+        ("meta", stm.PRIORITY_METADATA),
+        ("ui", stm.PRIORITY_INTERACTIVE),
+    ]
+    with scheduler.slot(URL, stm.PRIORITY_SYNC, "busy"):
+        for index, (job, priority) in enumerate(waiting, start=1):
+            thread = threading.Thread(target=request, args=(job, priority))
+            thread.start()
+            threads.append(thread)
+            _wait_for_waiters(scheduler, index)
+    for thread in threads:
+        thread.join(5)
+    assert order == ["ui", "sync", "meta"]